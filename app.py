@@ -1,7 +1,10 @@
 import streamlit as st
-import json
-from jinja2 import Template
+import orjson
+import ijson
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+import os
 import io
+import re
 import datetime
 
 # --- CONFIGURATION ---
@@ -14,22 +17,81 @@ BIO_FIELDS = [
     'Preferred Start Date', 'Preferred Start Date1', 'Submission Time'
 ]
 
+# A JSON upload must open with an array or object after optional whitespace
+_JSON_START_RE = re.compile(rb"\s*[\[{]")
+
+# Uploads at or above this size are streamed instead of fully parsed
+# (only up to the first row, so anything after it is not validated)
+STREAM_THRESHOLD_BYTES = 1024 * 1024
+
+# Key prefixes of internal Excel/OData fields that never belong in the report
+_SKIP_PREFIXES = ("@",)
+
+# Bio fields holding Excel serial dates that need formatting (lowercase)
+DATE_FIELDS = frozenset({
+    'completion time', 'start time', 'submission time',
+    'preferred start date', 'preferred start date1'
+})
+
+# Lowercased bio field name -> "date" | "bio", so each key needs one hashed lookup
+KIND_MAP = {
+    f.lower(): ("date" if f.lower() in DATE_FIELDS else "bio") for f in BIO_FIELDS
+}
+
+def _build_environment(bytecode_cache=None):
+    """
+    Creates the Jinja environment for the report templates.
+    """
+    # Templates never change at runtime, so skip the mtime check
+    return Environment(
+        loader=FileSystemLoader("templates"),
+        bytecode_cache=bytecode_cache,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False
+    )
+
+@st.cache_resource
+def get_template():
+    """
+    Compiles the report template once per process and reuses it across reruns.
+    Streamlit re-executes this script on every rerun, so the Jinja environment
+    lives inside the cached resource rather than at module level.
+    """
+    # Persist compiled bytecode so process restarts skip parsing the template
+    try:
+        os.makedirs(".jinja_cache", exist_ok=True)
+        env = _build_environment(FileSystemBytecodeCache(".jinja_cache"))
+        return env.get_template("report_template.html")
+    except OSError:
+        # Unwritable working directory: the bytecode cache is optional
+        return _build_environment().get_template("report_template.html")
+
+# SharePoint/Excel character escapes found in column names
+_ESCAPES = {"_x002e_": ".", "_x003a_": ":", "_x0023_": "#"}
+_ESC_RE = re.compile("|".join(map(re.escape, _ESCAPES)))
+
+# Fields that may carry variable suffixes and are normalized to a fixed name
+_NORMALIZED_RE = re.compile(r"(LinkedIn Profile URL|Portfolio URL)")
+
 def clean_key(key):
     """
     Cleans SharePoint/Excel encoded characters from keys.
     """
-    key = key.replace("_x002e_", ".")
-    key = key.replace("_x003a_", ":")
-    key = key.replace("_x0023_", "#")
+    # Most keys carry no escapes; only run the substitution when one may be present
+    if "_x" in key:
+        key = _ESC_RE.sub(lambda m: _ESCAPES[m.group(0)], key)
     
     # Normalize specific fields with variable suffixes
-    if "LinkedIn Profile URL" in key:
-        return "LinkedIn Profile URL"
-    if "Portfolio URL" in key:
-        return "Portfolio URL"
+    match = _NORMALIZED_RE.search(key)
+    if match:
+        return match.group(1)
     
     return key.strip()
 
+# Excel base date is usually Dec 30, 1899
+_EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+
 def format_excel_date(serial):
     """
     Converts Excel serial date to readable string.
@@ -37,82 +99,125 @@ def format_excel_date(serial):
     if not serial:
         return "N/A"
     try:
-        # Check if it looks like a float/int
-        float(serial)
-        # Excel base date is usually Dec 30, 1899
-        base_date = datetime.datetime(1899, 12, 30)
-        delta = datetime.timedelta(days=float(serial))
-        return (base_date + delta).strftime("%B %d, %Y")
-    except ValueError:
+        # Parse the serial once and convert it to a calendar date
+        days = float(serial)
+        return (_EXCEL_EPOCH + datetime.timedelta(days=days)).strftime("%B %d, %Y")
+    except (TypeError, ValueError, OverflowError):
+        # Not a usable serial (text, NaN, out of range), show as-is
         return serial
 
+def load_first_record(json_content, opener):
+    """
+    Returns the first candidate row from the Power Automate JSON, or None.
+    Large uploads are streamed with ijson so only the first row is parsed;
+    opener is the document's first non-whitespace byte (b"[" or b"{").
+    """
+    if len(json_content) < STREAM_THRESHOLD_BYTES:
+        data = orjson.loads(json_content)
+        
+        # Power Automate 'List rows' returns a list. Get the first item.
+        if isinstance(data, list):
+            return data[0] if data else None
+        if isinstance(data, dict):
+            # Handle case where full OData response is saved
+            rows = data.get('value')
+            if isinstance(rows, list) and rows:
+                return rows[0]
+        return None
+
+    # Pick the document shape from its opening byte so the stream is read once
+    events = ijson.parse(io.BytesIO(json_content), use_float=True)
+    if opener == b"[":
+        return next(ijson.items(events, 'item'), None)
+
+    # Full OData response: only a top-level 'value' array holds candidate rows
+    for prefix, event, _ in events:
+        if prefix == 'value':
+            if event != 'start_array':
+                return None
+            return next(ijson.items(events, 'value.item'), None)
+    return None
+
 def parse_json_data(json_content):
     """
     Parses the Power Automate JSON. output.
-    Expected Input: A list containing a single dictionary object (the candidate row).
+    Expected Input: Raw UTF-8 bytes of the uploaded file, holding a list with a
+    single dictionary object (the candidate row). Bytes are parsed as-is, no decode step.
     Returns: 
         - metadata (dict): Key-value pairs for bio info
         - qa_list (list): List of dicts {'question': '...', 'answer': '...'}
     """
+    # Reject empty or non-JSON uploads before handing them to the parser
+    start = _JSON_START_RE.match(json_content) if json_content else None
+    if start is None:
+        st.error("JSON Parsing Error: upload is empty or does not start with a JSON array/object")
+        return None, None
+    opener = json_content[start.end() - 1:start.end()]
+
     try:
-        data = json.loads(json_content)
-        
-        # Power Automate 'List rows' returns a list. Get the first item.
-        if isinstance(data, list) and len(data) > 0:
-            candidate_data = data[0]
-        elif isinstance(data, dict) and 'value' in data:
-             # Handle case where full OData response is saved
-            candidate_data = data['value'][0]
-        else:
+        candidate_data = load_first_record(json_content, opener)
+        if candidate_data is None:
             return None, None
 
         # Separate Bio from Technical Questions
         metadata = {}
         qa_list = []
+        qa_append = qa_list.append
 
         for key, value in candidate_data.items():
             # Skip internal Excel fields like @odata.etag
-            if key.startswith("@"):
+            if key.startswith(_SKIP_PREFIXES):
                 continue
             
             # Clean the key (decode characters, normalize names)
             clean_k = clean_key(key)
                 
             # Check if this column is in our known Bio Fields list (case insensitive check)
-            if any(bio_key.lower() == clean_k.lower() for bio_key in BIO_FIELDS):
-                # Apply date formatting if applicable
-                if clean_k in ['Completion time', 'Start time', 'Submission Time', 'Preferred Start Date', 'Preferred Start Date1']:
-                    metadata[clean_k] = format_excel_date(value)
-                else:
-                    metadata[clean_k] = value
-            else:
+            kind = KIND_MAP.get(clean_k.lower())
+            if kind == "date":
+                # Apply date formatting; blanks stay blank so render_report can fall back
+                metadata[clean_k] = format_excel_date(value) if value else value
+            elif kind == "bio":
+                metadata[clean_k] = value
+            elif value:
                 # It's a technical question
                 # Only add if the answer isn't empty/null (optional cleanup)
-                if value: 
-                    qa_list.append({'question': clean_k, 'answer': str(value)})
+                # Forms text answers are already strings; only coerce numbers, bools, etc.
+                answer = value if isinstance(value, str) else str(value)
+                qa_append({'question': clean_k, 'answer': answer})
 
         return metadata, qa_list
     except Exception as e:
         st.error(f"JSON Parsing Error: {e}")
         return None, None
 
-def render_report(metadata, qa_list, template_code):
+def candidate_name_of(metadata):
+    """
+    Resolves the candidate's display name, falling back when a column is blank.
+    """
+    return metadata.get('First & Last Name') or metadata.get('Name') or 'Unknown Candidate'
+
+def render_report(metadata, qa_list):
     """
     Injects data into the HTML template.
     """
-    template = Template(template_code)
-    
-    # Safe getters for metadata to prevent crashes if fields are missing
-    rendered_html = template.render(
-        candidate_name=metadata.get('First & Last Name', metadata.get('Name', 'Unknown Candidate')),
-        position_type=metadata.get('Position Type', 'N/A'),
-        email=metadata.get('Email1', metadata.get('Email', 'N/A')),
-        submission_time=metadata.get('Completion time', 'N/A'),
-        preferred_start_date=metadata.get('Preferred Start Date1', metadata.get('Preferred Start Date', 'N/A')),
-        linkedin_url=metadata.get('LinkedIn Profile URL', '#'),
-        portfolio_url=metadata.get('Portfolio URL', '#'),
-        degree=metadata.get('Degree', 'N/A'),
-        grad_year=metadata.get('Graduation Year', 'N/A'),
+    # Safe getters for metadata to prevent crashes if fields are missing.
+    # Fields with a fallback column are resolved once; blank values fall through.
+    get = metadata.get
+    candidate_name = candidate_name_of(metadata)
+    email = get('Email1') or get('Email') or 'N/A'
+    preferred_start_date = get('Preferred Start Date1') or get('Preferred Start Date') or 'N/A'
+
+    rendered_html = get_template().render(
+        candidate_name=candidate_name,
+        position_type=get('Position Type', 'N/A'),
+        email=email,
+        submission_time=get('Completion time') or 'N/A',
+        preferred_start_date=preferred_start_date,
+        linkedin_url=get('LinkedIn Profile URL', '#'),
+        portfolio_url=get('Portfolio URL', '#'),
+        degree=get('Degree', 'N/A'),
+        grad_year=get('Graduation Year', 'N/A'),
         qa_list=qa_list
     )
     return rendered_html
@@ -129,17 +234,13 @@ with col1:
     uploaded_tech_file = st.file_uploader("Upload Technical JSON (from Power Automate Flow)", type=['json'], key="tech")
     
     if uploaded_tech_file is not None:
-        # Load the Template
-        with open("templates/report_template.html", "r") as f:
-            template_html = f.read()
-
-        # Parse Data
-        raw_json = uploaded_tech_file.getvalue().decode("utf-8")
+        # Parse Data (hand the uploaded bytes straight to the parser)
+        raw_json = uploaded_tech_file.getvalue()
         metadata, qa_list = parse_json_data(raw_json)
 
         if metadata:
             # Render
-            final_report = render_report(metadata, qa_list, template_html)
+            final_report = render_report(metadata, qa_list)
             
             st.success("Report Generated Successfully!")
             
@@ -147,7 +248,7 @@ with col1:
             st.download_button(
                 label="Download HTML Report",
                 data=final_report,
-                file_name=f"Report_{metadata.get('First & Last Name', 'Candidate')}.html",
+                file_name=f"Report_{candidate_name_of(metadata)}.html",
                 mime="text/html"
             )
             